@@ -1,40 +1,99 @@
 import os
 import sys
-from typing import Awaitable, Callable, Dict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Final,
+    FrozenSet,
+    MutableMapping,
+    Tuple,
+)
 
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
 
-class App:
+_VERSION: Final[str] = "%d.%d.%d" % sys.version_info[:3]
+_VALID_PROCESS_MANAGERS: Final[FrozenSet[str]] = frozenset(("gunicorn", "uvicorn"))
+
+
+def _body(process_manager: str) -> bytes:
+    """Encode the response body for the given process manager."""
+    if process_manager not in _VALID_PROCESS_MANAGERS:
+        raise NameError("Process manager needs to be either uvicorn or gunicorn.")
+    server = "Uvicorn" if process_manager == "uvicorn" else "Uvicorn, Gunicorn,"
+    message = f"Hello World, from {server} and Python {_VERSION}!"
+    return message.encode("utf-8")
+
+
+def _response_messages(body: bytes) -> Tuple[Message, Message]:
+    """Build the response start and body messages, with headers precomputed."""
+    start_message = {
+        "type": "http.response.start",
+        "status": 200,
+        # Uvicorn's h11 protocol concatenates a list of default headers with these.
+        "headers": [
+            (b"content-type", b"text/plain"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ],
+    }
+    return start_message, {"type": "http.response.body", "body": body}
+
+
+# The body is encoded once and the same message objects are sent on every request.
+# ASGI servers read these messages without mutating them, so sharing them is safe.
+# Both messages are rebound together, so a request never sees a mismatched pair.
+_BODY: bytes = _body(os.getenv("PROCESS_MANAGER", "gunicorn"))
+_RESPONSE_MESSAGES: Tuple[Message, Message] = _response_messages(_BODY)
+
+
+def _refresh() -> None:
+    """Re-read `PROCESS_MANAGER` from the environment and rebuild the response."""
+    global _BODY, _RESPONSE_MESSAGES
+    _BODY = _body(os.getenv("PROCESS_MANAGER", "gunicorn"))
+    _RESPONSE_MESSAGES = _response_messages(_BODY)
+
+
+async def _handle_http(receive: Receive, send: Send) -> None:
+    """Send the prebuilt response messages."""
+    for message in _RESPONSE_MESSAGES:
+        await send(message)
+
+
+async def _handle_lifespan(receive: Receive, send: Send) -> None:
+    """Acknowledge ASGI lifespan startup and shutdown events."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def _handle_websocket(receive: Receive, send: Send) -> None:
+    """Close WebSocket connections, which the base ASGI app does not serve."""
+    await send({"type": "websocket.close"})
+
+
+_DISPATCH: Final[Dict[str, Callable[[Receive, Send], Awaitable[None]]]] = {
+    "http": _handle_http,
+    "lifespan": _handle_lifespan,
+    "websocket": _handle_websocket,
+}
+
+
+async def app(scope: Message, receive: Receive, send: Send) -> None:
     """Define a simple ASGI interface for use with Uvicorn.
     ---
     https://www.uvicorn.org/
-    """
 
-    def __init__(self, scope: Dict) -> None:
-        assert scope["type"] == "http"
-        self.scope = scope
-
-    async def __call__(
-        self, receive: Dict, send: Callable[[Dict], Awaitable]
-    ) -> Dict[str, str]:
-        await send(
-            {
-                "type": "http.response.start",
-                "status": 200,
-                "headers": [[b"content-type", b"text/plain"]],
-            }
-        )
-        version = (
-            f"{sys.version_info.major}.{sys.version_info.minor}"
-            f".{sys.version_info.micro}"
-        )
-        process_manager = os.getenv("PROCESS_MANAGER", "gunicorn")
-        if process_manager not in ["gunicorn", "uvicorn"]:
-            raise NameError("Process manager needs to be either uvicorn or gunicorn.")
-        server = "Uvicorn" if process_manager == "uvicorn" else "Uvicorn, Gunicorn,"
-        message = f"Hello World, from {server} and Python {version}!"
-        response: Dict = {"type": "http.response.body", "body": message.encode("utf-8")}
-        await send(response)
-        return response
-
-
-app: Callable = App
+    Requests are dispatched on the ASGI scope type with a single dictionary lookup:
+    `http` sends the prebuilt response, `lifespan` acknowledges startup and
+    shutdown, and `websocket` closes the connection. Other scope types are ignored.
+    """
+    handler = _DISPATCH.get(scope["type"])
+    if handler is not None:
+        await handler(receive, send)
@@ -1,7 +1,7 @@
 import os
 import shutil
 from pathlib import Path
-from typing import List
+from typing import Callable
 
 import pytest
 from fastapi.testclient import TestClient
@@ -9,6 +9,7 @@ from pytest_mock import MockerFixture
 
 from inboard import gunicorn_conf as gunicorn_conf_module
 from inboard import logging_conf as logging_conf_module
+from inboard.app import main_base as main_base_module
 from inboard.app import prestart as pre_start_module
 from inboard.app.main_base import app as base_app
 from inboard.app.main_fastapi import app as fastapi_app
@@ -45,9 +46,30 @@ def client_asgi() -> TestClient:
 
 
 @pytest.fixture(scope="session")
-def clients() -> List[TestClient]:
-    """Instantiate test client classes."""
-    return [TestClient(fastapi_app), TestClient(starlette_app)]
+def client_fastapi() -> TestClient:
+    """Instantiate test client class for the FastAPI app."""
+    return TestClient(fastapi_app)
+
+
+@pytest.fixture(scope="session")
+def client_starlette() -> TestClient:
+    """Instantiate test client class for the Starlette app."""
+    return TestClient(starlette_app)
+
+
+@pytest.fixture(params=["fastapi", "starlette"])
+def client(request: pytest.FixtureRequest) -> TestClient:
+    """Return each app's test client, running dependent tests once per app."""
+    client: TestClient = request.getfixturevalue(f"client_{request.param}")
+    return client
+
+
+@pytest.fixture
+def refresh_base_app(monkeypatch: pytest.MonkeyPatch) -> Callable[[], None]:
+    """Re-read base ASGI app settings, restoring the originals after the test."""
+    for name in ("_BODY", "_RESPONSE_MESSAGES"):
+        monkeypatch.setattr(main_base_module, name, getattr(main_base_module, name))
+    return main_base_module._refresh
 
 
 @pytest.fixture